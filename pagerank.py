@@ -1,22 +1,39 @@
 import os
-import random
 import re
 import sys
+from dataclasses import dataclass
+
+import numpy as np
+
+try:
+    from scipy.sparse import csr_matrix
+except ImportError:
+    csr_matrix = None
+
+try:
+    from numba import njit, prange
+except ImportError:
+    njit = None
 
 DAMPING = 0.85
 SAMPLES = 10000
 CONVERGENCE = 0.001
+MAX_ITERATIONS = 100
+SPECIALIZE_MAX = 64
+
+LINK_PATTERN = re.compile(r"<a\s+(?:[^>]*?)href=\"([^\"]*)\"")
 
 
 def main():
     if len(sys.argv) != 2:
         sys.exit("Usage: python pagerank.py corpus")
     corpus = crawl(sys.argv[1])
-    ranks = sample_pagerank(corpus, DAMPING, SAMPLES)
+    graph = compile_corpus(corpus)
+    ranks = sample_pagerank(corpus, DAMPING, SAMPLES, graph)
     print(f"PageRank Results from Sampling (n = {SAMPLES})")
     for page in sorted(ranks):
         print(f"  {page}: {ranks[page]:.4f}")
-    ranks = iterate_pagerank(corpus, DAMPING)
+    ranks = iterate_pagerank(corpus, DAMPING, graph)
     print(f"PageRank Results from Iteration")
     for page in sorted(ranks):
         print(f"  {page}: {ranks[page]:.4f}")
@@ -36,16 +53,65 @@ def crawl(directory):
             continue
         with open(os.path.join(directory, filename)) as f:
             contents = f.read()
-            links = re.findall(r"<a\s+(?:[^>]*?)href=\"([^\"]*)\"", contents)
-            pages[filename] = set(links) - {filename}
+            pages[filename] = {
+                match.group(1) for match in LINK_PATTERN.finditer(contents)
+            } - {filename}
 
     # Only include links to other pages in the corpus
     for filename in pages:
-        pages[filename] = set(link for link in pages[filename] if link in pages)
+        pages[filename] &= pages.keys()
 
     return pages
 
 
+@dataclass(frozen=True)
+class CompiledGraph:
+    """
+    The corpus flattened to integer-indexed arrays: `names` maps page ids
+    back to page names, `indptr`/`indices` form the in-link graph in CSR
+    form (row p lists the ids of pages linking to p), `outdeg` counts
+    each page's outgoing links, and `dangling` lists the ids of pages
+    with no outgoing links.
+    """
+
+    names: tuple[str, ...]
+    indptr: np.ndarray
+    indices: np.ndarray
+    outdeg: np.ndarray
+    dangling: np.ndarray
+
+
+def compile_corpus(corpus: dict[str, set[str]]) -> CompiledGraph:
+    """
+    Flatten the corpus dict of string sets into a CompiledGraph once, so
+    the hot loops of both algorithms work on compact int32 arrays instead
+    of hashing page names.
+    """
+
+    names = tuple(sorted(corpus))
+    index = {page: i for i, page in enumerate(names)}
+    size = len(names)
+
+    inlink_lists = [[] for _ in range(size)]
+    outdeg = np.zeros(size, dtype=np.int32)
+    for page, links in corpus.items():
+        j = index[page]
+        outdeg[j] = len(links)
+        for link in links:
+            inlink_lists[index[link]].append(j)
+
+    indptr = np.zeros(size + 1, dtype=np.int32)
+    np.cumsum([len(sources) for sources in inlink_lists], out=indptr[1:])
+    indices = np.fromiter(
+        (j for sources in inlink_lists for j in sources),
+        dtype=np.int32,
+        count=int(indptr[-1]),
+    )
+    dangling = np.flatnonzero(outdeg == 0).astype(np.int32)
+
+    return CompiledGraph(names, indptr, indices, outdeg, dangling)
+
+
 def transition_model(corpus, page, damping_factor):
     """
     Return a probability distribution over which page to visit next,
@@ -80,7 +146,24 @@ def transition_model(corpus, page, damping_factor):
     return probability_distro
 
 
-def sample_pagerank(corpus, damping_factor, n):
+def transition_cdf(graph, damping_factor):
+    """
+    Return the cumulative transition weights out of every page as one
+    dense (N, N) float64 matrix whose rows are indexed by source page id;
+    N x N is cheap at these corpus sizes and turns each sampling step
+    into a row index plus a binary search.
+    """
+
+    size = len(graph.names)
+    probabilities = np.full((size, size), (1 - damping_factor) / size)
+    for p in range(size):
+        sources = graph.indices[graph.indptr[p] : graph.indptr[p + 1]]
+        probabilities[sources, p] += damping_factor / graph.outdeg[sources]
+    probabilities[graph.dangling] += damping_factor / size
+    return np.cumsum(probabilities, axis=1)
+
+
+def sample_pagerank(corpus, damping_factor, n, graph=None):
     """
     Return PageRank values for each page by sampling `n` pages
     according to transition model, starting with a page at random.
@@ -90,29 +173,36 @@ def sample_pagerank(corpus, damping_factor, n):
     PageRank values should sum to 1.
     """
 
-    # Keep track of page hits to calculate pagerank
-    page_hits = {corpus_page: 0 for corpus_page in corpus.keys()}
-    current_page = None
-    current_n = 0
+    if graph is None:
+        graph = compile_corpus(corpus)
+    pages = graph.names
+    size = len(pages)
 
-    while current_n < n:
-        # Start by choosing a random page of equal probability
-        if current_page is None:
-            current_page = random.choice(list(corpus))
-            page_hits[current_page] += 1
-            current_n += 1
-            continue
-        model = transition_model(corpus, current_page, damping_factor)
+    cumulative_rows = transition_cdf(graph, damping_factor)
+
+    # Keep track of page hits in a flat array indexed by page id
+    hits = np.zeros(size, dtype=np.int64)
+
+    # Only the walk itself is sequential, so draw all randomness up front
+    # in one C-level call
+    rng = np.random.default_rng()
+    draws = rng.random(n - 1)
+
+    # Start by choosing a random page of equal probability
+    current = rng.integers(size)
+    hits[current] += 1
+
+    for draw in draws:
         # Choose a page given the probability as weights
-        current_page = random.choices(list(model.keys()), list(model.values()))[0]
-        page_hits[current_page] += 1
-        current_n += 1
+        row = cumulative_rows[current]
+        current = np.searchsorted(row, draw * row[-1])
+        hits[current] += 1
 
     # Determine pagerank by dividing hits by the sample number
-    return {page: hits / n for page, hits in page_hits.items()}
+    return {pages[i]: hits[i] / n for i in range(size)}
 
 
-def iterate_pagerank(corpus, damping_factor):
+def iterate_pagerank(corpus, damping_factor, graph=None):
     """
     Return PageRank values for each page by iteratively updating
     PageRank values until convergence.
@@ -122,50 +212,228 @@ def iterate_pagerank(corpus, damping_factor):
     PageRank values should sum to 1.
     """
 
-    # Initialize every pagerank with equal probability
-    pageranks = {page: float(1 / len(corpus)) for page in corpus.keys()}
+    if graph is None:
+        graph = compile_corpus(corpus)
+    size = len(graph.names)
+
+    # For small corpora the fixed cost of JIT compilation or sparse
+    # setup dwarfs the arithmetic, so run an update function unrolled
+    # for this exact graph instead
+    if size <= SPECIALIZE_MAX:
+        step = _specialize_step(graph, damping_factor)
+        x = (1 / size,) * size
+        for _ in range(MAX_ITERATIONS):
+            xlast = x
+            x = step(x)
+            if sum(abs(new - old) for new, old in zip(x, xlast)) < CONVERGENCE:
+                break
+        return dict(zip(graph.names, x))
+
+    # Fall back to the pure-Python fixed-point solver without scipy/numba
+    if csr_matrix is None and njit is None:
+        pageranks = {page: float(1 / len(corpus)) for page in corpus.keys()}
+
+        # Invert the link graph once so each update reads its in-links
+        # directly instead of rescanning the whole corpus
+        inlinks = {page: [] for page in corpus}
+        outdeg = {}
+        dangling = set()
+        for page, links in corpus.items():
+            outdeg[page] = len(links)
+            if not links:
+                dangling.add(page)
+            for target in links:
+                inlinks[target].append(page)
+
+        return rank_pages(
+            corpus, damping_factor, pageranks, inlinks, outdeg, dangling
+        )
+
+    # The sweep is memory-bound and results are printed to 4 decimals,
+    # so float32 state halves the bytes streamed per iteration; only the
+    # convergence reduction stays in float64
+    inv_outdeg = np.zeros(size, dtype=np.float32)
+    np.divide(1.0, graph.outdeg, out=inv_outdeg, where=graph.outdeg > 0)
+
+    # Dangling pages spread their rank uniformly instead of storing
+    # explicit all-to-all edges
+    x = np.full(size, 1 / size, dtype=np.float32)
+    if njit is not None:
+        for _ in range(MAX_ITERATIONS):
+            dangle_sum = float(x[graph.dangling].sum())
+            delta = _power_iteration_step(
+                graph.indptr,
+                graph.indices,
+                inv_outdeg,
+                x,
+                damping_factor,
+                dangle_sum,
+                size,
+            )
+            if delta < CONVERGENCE:
+                break
+    else:
+        # Column-stochastic adjacency: entry (p, j) holds 1/outdeg(j)
+        # for every link j -> p
+        matrix = csr_matrix(
+            (inv_outdeg[graph.indices], graph.indices, graph.indptr),
+            shape=(size, size),
+        )
+        for _ in range(MAX_ITERATIONS):
+            xlast = x
+            dangle_sum = float(x[graph.dangling].sum())
+            x = (1 - damping_factor) / size + damping_factor * (
+                matrix @ x + dangle_sum / size
+            )
+            if np.abs(x - xlast).sum(dtype=np.float64) < CONVERGENCE:
+                break
+
+    return dict(zip(graph.names, x))
+
+
+if njit is not None:
+
+    @njit(parallel=True, fastmath=True, nogil=True, cache=True)
+    def _power_iteration_step(
+        indptr, indices, inv_outdeg, x, damping_factor, dangle_sum, size
+    ):
+        """
+        Run one barrier-free sweep over the in-link CSR arrays, updating
+        the single shared rank vector in place and returning the sweep's
+        L1 delta.
+
+        Threads write disjoint slots of `x` and may read neighbors that
+        another thread refreshed mid-sweep; such asynchronous (ordered)
+        updates only accelerate the fixed-point convergence, so no
+        second vector or intra-sweep synchronization is needed.
+        """
+        delta = 0.0
+        for p in prange(size):
+            total = np.float32(0.0)
+            for k in range(indptr[p], indptr[p + 1]):
+                source = indices[k]
+                total += x[source] * inv_outdeg[source]
+            updated = np.float32(
+                (1 - damping_factor) / size
+                + damping_factor * (total + dangle_sum / size)
+            )
+            delta += abs(np.float64(updated) - np.float64(x[p]))
+            x[p] = updated
+        return delta
+
 
-    return rank_pages(corpus, damping_factor, pageranks)
+def _specialize_step(graph: CompiledGraph, damping_factor: float):
+    """
+    Generate one full update sweep unrolled for this exact graph, compiled
+    once per run via exec.
+
+    Every in-link term becomes a literal multiply-add with its
+    damping/outdeg factor folded in as a constant, so the generated
+    function has no loop bookkeeping, indexing math, or dict lookups.
+    """
+
+    size = len(graph.names)
+    base = (1 - damping_factor) / size
+
+    lines = ["def step(x):"]
+    if graph.dangling.size:
+        dangle = " + ".join(f"x[{p}]" for p in graph.dangling)
+        lines.append(
+            f"    base = {base!r} + {damping_factor / size!r} * ({dangle})"
+        )
+    else:
+        lines.append(f"    base = {base!r}")
+    for p in range(size):
+        sources = graph.indices[graph.indptr[p] : graph.indptr[p + 1]]
+        terms = "".join(
+            f" + x[{j}] * {damping_factor / int(graph.outdeg[j])!r}"
+            for j in sources
+        )
+        lines.append(f"    y{p} = base{terms}")
+    results = ", ".join(f"y{p}" for p in range(size))
+    lines.append(f"    return ({results},)")
+
+    namespace = {}
+    exec("\n".join(lines), namespace)
+    return namespace["step"]
+
+
+def _update_order(corpus: dict[str, set[str]]) -> list[str]:
+    """
+    Order pages so that linkers come before the pages they link to where
+    the graph allows it (Kahn's algorithm); pages stuck in cycles are
+    appended afterwards in sorted order.
+    """
+
+    indegree = {page: 0 for page in corpus}
+    for links in corpus.values():
+        for link in links:
+            indegree[link] += 1
+
+    order = []
+    ready = sorted(page for page, degree in indegree.items() if degree == 0)
+    while ready:
+        page = ready.pop()
+        order.append(page)
+        for link in corpus[page]:
+            indegree[link] -= 1
+            if indegree[link] == 0:
+                ready.append(link)
+
+    order.extend(sorted(page for page in corpus if indegree[page] > 0))
+    return order
 
 
 def rank_pages(
-    corpus: dict[str, set[str]], damping_factor: float, pageranks: dict[str, float]
+    corpus: dict[str, set[str]],
+    damping_factor: float,
+    pageranks: dict[str, float],
+    inlinks: dict[str, list[str]],
+    outdeg: dict[str, int],
+    dangling: set[str],
 ) -> dict[str, float]:
     """Determine new page ranks from given page ranks."""
 
-    # Keep track to compare for convergence
-    old_pageranks = pageranks.copy()
-
-    for page_p, links in corpus.items():
-        if len(links) > 0:
+    # Updates below read the live pageranks dict, so each sweep is a
+    # Gauss-Seidel pass: later pages see the ranks already refreshed this
+    # sweep, which converges in fewer sweeps than a two-vector Jacobi
+    # pass. Sweeping sources before the pages they link to pushes fresh
+    # rank as far as possible within one sweep.
+    order = _update_order(corpus)
+
+    # Snapshot the ranks as a flat vector so the convergence test is one
+    # vectorized subtract-and-reduce instead of a dict copy plus a
+    # Python comparison per page
+    x = np.fromiter(
+        (pageranks[page] for page in order), dtype=np.float64, count=len(order)
+    )
+
+    for _ in range(MAX_ITERATIONS):
+        xlast = x
+
+        # Pages without links spread their rank uniformly; one pass here
+        # replaces per-page special-casing inside the update loop
+        dangle_mass = (
+            damping_factor
+            * sum(pageranks[page] for page in dangling)
+            / len(corpus)
+        )
+
+        for page_p in order:
             pageranks[page_p] = (1 - damping_factor) / len(
                 corpus
-            ) + damping_factor * sum(
-                [
-                    pageranks[link] / len(corpus[link])
-                    for link in [
-                        page_i
-                        for page_i, page_i_links in corpus.items()
-                        if page_p in page_i_links
-                    ]  # Creates an array of pages (i) that link to the targeted page (p)
-                ]
+            ) + dangle_mass + damping_factor * sum(
+                pageranks[page_i] / outdeg[page_i] for page_i in inlinks[page_p]
             )
-        else:
-            corpus[page_p] = set(corpus.keys())
-            pageranks[page_p] = (1 - damping_factor) / len(
-                corpus
-            ) + damping_factor * sum(
-                [pageranks[link] / len(corpus[link]) for link in links]
-            )  #  If no links, choose from every page (inclusive) instead
-
-    converged = True
-    for page, pagerank in pageranks.items():
-        if abs(old_pageranks[page] - pagerank) > CONVERGENCE:
-            converged = False
-            break
 
-    if not converged:
-        rank_pages(corpus, damping_factor, pageranks)
+        x = np.fromiter(
+            (pageranks[page] for page in order),
+            dtype=np.float64,
+            count=len(order),
+        )
+        # L1 error against the previous sweep
+        if np.abs(x - xlast).sum() < CONVERGENCE * len(corpus):
+            break
 
     return pageranks
 